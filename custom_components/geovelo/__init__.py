@@ -1,13 +1,18 @@
 import os
 import re
+import time
+import asyncio
 import json
 import gzip
 import copy
 import base64
+import hashlib
+import uuid
 import urllib.parse
 import logging
 from functools import partial
-from datetime import timedelta, datetime
+from operator import itemgetter
+from datetime import timedelta, datetime, date
 from zoneinfo import ZoneInfo
 from typing import Any, Dict, Optional, Tuple, List
 from dateutil import tz
@@ -19,8 +24,9 @@ from collections.abc import Callable
 from homeassistant.components.sensor.const import SensorStateClass
 from homeassistant.helpers.storage import Store
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.const import Platform, STATE_ON
+from homeassistant.const import Platform, STATE_ON, EVENT_HOMEASSISTANT_STOP
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity import EntityCategory
@@ -32,7 +38,9 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util.ssl import get_default_context
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.components import persistent_notification, webhook
 from homeassistant.components.image import ImageEntity, ImageEntityDescription
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -42,6 +50,16 @@ from homeassistant.components.sensor import (
 from homeassistant.util import dt as dt_util
 from .const import DOMAIN, GEOVELO_API_URL
 from .api import GeoveloApi, GeoveloApiError
+from .analytics import CyclingCalendar, TracePrefixSums, compute_trace_analytics
+from .export import (
+    export_header,
+    export_footer,
+    write_export,
+    write_export_traces,
+    remove_export,
+)
+from .services import async_setup_services, async_unload_services
+from .statistics import daily_statistics, day_start, async_import_daily_statistics
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -50,11 +68,42 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
 
+    if "webhook_id" not in entry.data:
+        # done before subscribing to config updates, to avoid reloading the entry
+        webhook_id = webhook.async_generate_id()
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, "webhook_id": webhook_id}
+        )
+        persistent_notification.async_create(
+            hass,
+            f"Latest trips of geovelo account {entry.data.get('user_id')} can be fetched on demand "
+            f"by sending a POST request to /api/webhook/{webhook_id} (for instance from a phone shortcut at the end of a ride).",
+            title="Geovelo refresh webhook",
+            notification_id=f"{DOMAIN}_{entry.entry_id}_webhook",
+        )
+
     # here we store the coordinator for future access
     if entry.entry_id not in hass.data[DOMAIN]:
         hass.data[DOMAIN][entry.entry_id] = {}
-    hass.data[DOMAIN][entry.entry_id]["geovelo_coordinator"] = GeoveloAPICoordinator(
-        hass, dict(entry.data)
+    coordinator = GeoveloAPICoordinator(hass, dict(entry.data))
+    hass.data[DOMAIN][entry.entry_id]["geovelo_coordinator"] = coordinator
+
+    async def close_coordinator(event):
+        await coordinator.async_shutdown()
+
+    entry.async_on_unload(
+        hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, close_coordinator)
+    )
+
+    async def handle_webhook(hass, webhook_id, request):
+        _LOGGER.debug(f"Refresh requested through webhook for {entry.data.get('user_id')}")
+        hass.async_create_task(coordinator.async_request_quick_refresh())
+
+    webhook.async_register(
+        hass, DOMAIN, "Geovelo refresh", entry.data["webhook_id"], handle_webhook
+    )
+    entry.async_on_unload(
+        partial(webhook.async_unregister, hass, entry.data["webhook_id"])
     )
 
     # will make sure async_setup_entry from sensor.py is called
@@ -62,6 +111,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         entry, [Platform.SENSOR, Platform.IMAGE]
     )
 
+    async_setup_services(hass)
+
     # subscribe to config updates
     entry.async_on_unload(entry.add_update_listener(update_entry))
 
@@ -88,7 +139,10 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         old_entry = hass.data[DOMAIN].pop(entry.entry_id)
         if "geovelo_coordinator" in old_entry:
             coordinator = old_entry["geovelo_coordinator"]
+            await coordinator.async_shutdown()
             await coordinator.clean_cache()
+        if len(hass.data[DOMAIN]) == 0:
+            async_unload_services(hass)
     return unload_ok
 
 
@@ -99,10 +153,49 @@ def parse_date(string):
         return datetime.strptime(string, "%Y-%m-%dT%H:%M:%S%z")
 
 
+def trace_day(trace) -> date:
+    return parse_date(trace["start_datetime"]).date()
+
+
+def statistics_day(trace) -> date:
+    """Day of the trip in Home Assistant time zone, which long term statistics are bucketed by"""
+    return dt_util.as_local(parse_date(trace["start_datetime"])).date()
+
+
+def is_night_trip(trace) -> bool:
+    progress = trace.get("usertracegameprogress")
+    if progress is None:
+        return False
+    return bool(progress.get("during_night"))
+
+
+def prefix_sums_entry(trace) -> Tuple[float, dict]:
+    return (
+        parse_date(trace["start_datetime"]).timestamp(),
+        {
+            "distance": trace["distance"] or 0,
+            "duration": trace["duration"] or 0,
+            "vertical_gain": trace.get("vertical_gain") or 0,
+            "count": 1,
+            "night": 1 if is_night_trip(trace) else 0,
+        },
+    )
+
+
+def trace_hash(trace) -> str:
+    """Fingerprint of a trace as returned by the api, to detect edits"""
+    content = json.dumps(trace, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
 class GeoveloAPICoordinator(DataUpdateCoordinator):
     """A coordinator to fetch data from the api only once"""
 
     STORE_VERSION = 1
+    # minimum spacing between two refreshes requested on demand
+    QUICK_REFRESH_COOLDOWN = timedelta(seconds=60)
+    # zones are refreshed at least this often, even without new trips
+    ZONES_MAX_AGE = timedelta(days=1)
 
     def __init__(self, hass, config: ConfigType):
         super().__init__(
@@ -120,7 +213,55 @@ class GeoveloAPICoordinator(DataUpdateCoordinator):
             minor_version=2,
             key=f"geovelo_traces_{self.config['user_id']}",
         )
+        # metadata about synchronization with geovelo, kept apart from traces
+        self._sync_store = Store(
+            hass,
+            version=self.STORE_VERSION,
+            key=f"geovelo_sync_{self.config['user_id']}",
+        )
         self._has_loaded_once = False
+        self._calendar = CyclingCalendar()
+        self._prefix_sums = TracePrefixSums()
+        # trace id -> position in the traces list
+        self._trace_index: dict[Any, int] = {}
+        # str(trace id) -> hash of the trace as returned by the api
+        self._trace_hashes: dict[str, str] = {}
+        # last edits, as (timestamp when the edit was noticed, age in days of the edited trip then)
+        self._edits: list[Tuple[float, float]] = []
+        self._last_wide_sync: Optional[datetime] = None
+        self._last_end: Optional[datetime] = None
+        # bumped every time traces change, lets entities skip recomputations
+        self._revision = 0
+        # last day imported in long term statistics
+        self._statistics_watermark: Optional[date] = None
+        # days whose statistics changed since last import
+        self._statistics_dirty_days: set[date] = set()
+        self._zones_fetched_at: Optional[datetime] = None
+        # set when trips changed after zones were fetched, until zones are fetched again
+        self._zones_stale = False
+        self._sync_metadata_dirty = False
+        # traces changed since they were last written to the store
+        self._traces_dirty = False
+        self._refresh_stats = {
+            "duration": None,
+            "requests": None,
+            "requests_saved": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+        }
+        # a single client for the lifetime of the coordinator, to reuse connections across requests
+        self._api = GeoveloApi(ssl_context=get_default_context())
+        # full and quick refreshes both modify traces
+        self._refresh_lock = asyncio.Lock()
+        self._quick_refresh_failure: Optional[Exception] = None
+        self._quick_refresh_runs = 0
+        self._quick_refresh_debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=self.QUICK_REFRESH_COOLDOWN.total_seconds(),
+            immediate=True,
+            function=self._quick_refresh,
+        )
 
     async def clean_cache(self):
         self._custom_store.async_remove()
@@ -130,22 +271,294 @@ class GeoveloAPICoordinator(DataUpdateCoordinator):
         Compress <key> from d, in place
         """
         s = json.dumps(d[key])
-        d[key] = base64.b64encode(gzip.compress(s.encode())).decode()
+        # fastest level: traces are compressed on the event loop as they are ingested
+        d[key] = base64.b64encode(gzip.compress(s.encode(), compresslevel=1)).decode()
+
+    # kept compressed in memory and on disk, only exports decompress them
+    COMPRESSED_KEYS = ["geometry"]
+    # raw arrays only kept until analytics have been computed from them
+    ANALYTICS_KEYS = ["elevations", "speeds"]
+
+    # number of recent edits used to size the overlap window
+    EDIT_HISTORY_SIZE = 20
+    # the window an edit asks for halves every week, until it falls below MIN_OVERLAP
+    EDIT_HALF_LIFE = timedelta(days=7)
+    MIN_OVERLAP = timedelta(days=2)
+    MAX_OVERLAP = timedelta(days=30)
+    # a wide overlap is used from time to time to notice edits on older trips
+    WIDE_SYNC_INTERVAL = timedelta(days=1)
+
+    def _ingest_trace(self, trace):
+        """
+        Compute analytics of a newly fetched trace, in place
+        """
+        trace["analytics"] = compute_trace_analytics(trace)
+        for key in self.ANALYTICS_KEYS:
+            trace.pop(key, None)
+        for key in self.COMPRESSED_KEYS:
+            if trace.get(key) is not None:
+                self._compress_key(trace, key)
+
+    def _index_traces(self, traces):
+        """
+        Build in-memory indexes from traces loaded from the store
+        """
+        self._calendar = CyclingCalendar()
+        self._trace_index = {}
+        self._last_end = None
+        for i, trace in enumerate(traces):
+            self._trace_index[trace["id"]] = i
+            self._calendar.add(trace_day(trace))
+            end = parse_date(trace["end_datetime"])
+            if self._last_end is None or end > self._last_end:
+                self._last_end = end
+        self._prefix_sums = TracePrefixSums(
+            prefix_sums_entry(trace) for trace in traces
+        )
 
-    def _decompress_key(self, d, key, i):
+    def _overlap_window(self, now: datetime) -> timedelta:
         """
-        Decompress <key> from d, in place
+        How far before the last known trip we look for edited trips
         """
-        if isinstance(d[key], dict):
-            _LOGGER.warn(
-                f"For some reason {key} ({i}) had not been compressed when storing the file"
+        if (
+            self._last_wide_sync is None
+            or now - self._last_wide_sync > self.WIDE_SYNC_INTERVAL
+        ):
+            return self.MAX_OVERLAP
+        # edits keep being noticed while they happen often, rare ones fade away
+        window = max(
+            [self._edit_window(edit, now) for edit in self._edits],
+            default=self.MIN_OVERLAP,
+        )
+        return min(max(window, self.MIN_OVERLAP), self.MAX_OVERLAP)
+
+    def _edit_window(self, edit: Tuple[float, float], now: datetime) -> timedelta:
+        """
+        Window needed to notice a similar edit: one day of margin above the age of the edited trip,
+        decaying with the time elapsed since the edit was noticed
+        """
+        noticed_at, age = edit
+        elapsed = now.timestamp() - noticed_at
+        decay = 0.5 ** (elapsed / self.EDIT_HALF_LIFE.total_seconds())
+        return timedelta(days=(age + 1) * decay)
+
+    def _record_edit(self, age: timedelta, now: datetime):
+        self._edits = [
+            edit
+            for edit in self._edits
+            if self._edit_window(edit, now) > self.MIN_OVERLAP
+        ]
+        self._edits.append((now.timestamp(), age.total_seconds() / 3600 / 24))
+        self._edits = self._edits[-self.EDIT_HISTORY_SIZE :]
+
+    def _merge_traces(self, traces: list, new_traces: list) -> bool:
+        """
+        Insert new traces and update edited ones, in place.
+        Returns whether anything changed
+        """
+        changed = False
+        rebuild_indexes = False
+        # traces come most recent first, prefix sums are extended once at the end
+        prefix_sums_entries = []
+        now = datetime.now(tz=dt_util.get_default_time_zone())
+        for new_trace in new_traces:
+            content_hash = trace_hash(new_trace)
+            key = str(new_trace["id"])
+            previous_hash = self._trace_hashes.get(key)
+            if (
+                previous_hash == content_hash
+                and new_trace["id"] in self._trace_index
+            ):
+                continue
+            self._trace_hashes[key] = content_hash
+            self._sync_metadata_dirty = True
+            self._ingest_trace(new_trace)
+            changed = True
+            end = parse_date(new_trace["end_datetime"])
+            if self._last_end is None or end > self._last_end:
+                self._last_end = end
+
+            i = self._trace_index.get(new_trace["id"])
+            self._statistics_dirty_days.add(statistics_day(new_trace))
+            if i is None:
+                self._trace_index[new_trace["id"]] = len(traces)
+                traces.append(new_trace)
+                self._calendar.add(trace_day(new_trace))
+                prefix_sums_entries.append(prefix_sums_entry(new_trace))
+                continue
+            old_trace = traces[i]
+            traces[i] = new_trace
+            # edited values cannot be removed from calendar and prefix sums
+            rebuild_indexes = True
+            self._statistics_dirty_days.add(statistics_day(old_trace))
+            if previous_hash is not None:
+                # hash is unknown for traces stored before hashes were introduced
+                age = now - parse_date(old_trace["end_datetime"])
+                _LOGGER.debug(
+                    f"Trace {key} has been edited {age.days} days after the trip"
+                )
+                self._record_edit(age, now)
+        if rebuild_indexes:
+            self._index_traces(traces)
+        else:
+            self._prefix_sums.extend(prefix_sums_entries)
+        return changed
+
+    def _import_statistics(self, traces: list):
+        """
+        Push daily rollups to long term statistics, starting from the last imported day
+        """
+        if "recorder" not in self.hass.config.components:
+            return
+        if (
+            self._statistics_watermark is not None
+            and len(self._statistics_dirty_days) == 0
+        ):
+            return
+        first_day = self._statistics_watermark
+        if first_day is not None:
+            # last imported day may have received new trips since
+            first_day = min([first_day, *self._statistics_dirty_days])
+        timezone = dt_util.get_default_time_zone()
+        base = None
+        if first_day is not None:
+            # trips before the first day are only added up, prefix sums have them already
+            sums = self._prefix_sums.query(end=day_start(first_day, timezone).timestamp())
+            base = {
+                "distance": sums["distance"],
+                "duration": sums["duration"],
+                "trips": sums["count"],
+                "vertical_gain": sums["vertical_gain"],
+            }
+            # the date a trip started at in its own time zone is at most a day away from
+            # its date in Home Assistant time zone: older traces are skipped without parsing
+            earliest = (first_day - timedelta(days=1)).isoformat()
+            traces = [
+                trace for trace in traces if trace["start_datetime"][:10] >= earliest
+            ]
+        rows = daily_statistics(
+            ((statistics_day(trace), trace) for trace in traces),
+            timezone,
+            first_day,
+            self._statistics_dirty_days,
+            base,
+        )
+        async_import_daily_statistics(self.hass, self.config["user_id"], rows)
+        self._statistics_dirty_days = set()
+        days = [row["start"].date() for row in rows["trips"]]
+        if len(days) > 0:
+            self._statistics_watermark = max(
+                [*days, self._statistics_watermark or days[0]]
             )
+            self._sync_metadata_dirty = True
+
+    async def _load_sync_metadata(self):
+        data = await self._sync_store.async_load()
+        if data is None:
             return
-        binary = base64.b64decode(d[key].encode())
-        uncompressed = gzip.decompress(binary)
-        d[key] = json.loads(uncompressed)
+        self._trace_hashes = data.get("hashes", {})
+        self._edits = [tuple(edit) for edit in data.get("edits", [])]
+        if data.get("last_wide_sync") is not None:
+            self._last_wide_sync = datetime.fromisoformat(data["last_wide_sync"])
+        if data.get("statistics_watermark") is not None:
+            self._statistics_watermark = date.fromisoformat(
+                data["statistics_watermark"]
+            )
+
+    async def _store_sync_metadata(self):
+        if not self._sync_metadata_dirty:
+            return
+        self._sync_metadata_dirty = False
+        data = {
+            "hashes": self._trace_hashes,
+            "edits": self._edits,
+            "last_wide_sync": self._last_wide_sync.isoformat()
+            if self._last_wide_sync is not None
+            else None,
+            "statistics_watermark": self._statistics_watermark.isoformat()
+            if self._statistics_watermark is not None
+            else None,
+        }
+        try:
+            await self._sync_store.async_save(data)
+        except Exception as e:
+            _LOGGER.exception(f"Error while storing synchronization metadata: {e}")
+
+    # number of traces serialized and written at once during exports
+    EXPORT_CHUNK_SIZE = 500
 
-    COMPRESSED_KEYS = ["geometry", "elevations", "speeds"]
+    async def async_export_traces(
+        self,
+        path: str,
+        export_format: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Tuple[int, int]:
+        """
+        Write traces started between <start> and <end> (included) to <path>, chunk by chunk.
+        Returns the number of exported traces, and of traces skipped since their route is unknown
+        """
+        traces = self.data["traces"] if self.data is not None else []
+        # concurrent exports of the same range must not write to the same file
+        partial_path = f"{path}.{uuid.uuid4().hex}.part"
+        count = 0
+        skipped = 0
+        try:
+            await self.hass.async_add_executor_job(
+                write_export, partial_path, export_header(export_format), "w"
+            )
+            chunk = []
+            # index based iteration: a refresh may append traces while we wait for the executor
+            for i in range(len(traces)):
+                trace = traces[i]
+                day = trace_day(trace)
+                if (start is not None and day < start) or (
+                    end is not None and day > end
+                ):
+                    continue
+                if export_format == "gpx" and trace.get("geometry") is None:
+                    # route of traces stored before geometry was kept is unknown
+                    skipped += 1
+                    continue
+                chunk.append(trace)
+                if len(chunk) >= self.EXPORT_CHUNK_SIZE:
+                    await self.hass.async_add_executor_job(
+                        write_export_traces, partial_path, export_format, chunk
+                    )
+                    count += len(chunk)
+                    chunk = []
+            await self.hass.async_add_executor_job(
+                write_export_traces, partial_path, export_format, chunk
+            )
+            count += len(chunk)
+            await self.hass.async_add_executor_job(
+                write_export, partial_path, export_footer(export_format)
+            )
+            await self.hass.async_add_executor_job(os.replace, partial_path, path)
+        except BaseException:
+            await self.hass.async_add_executor_job(remove_export, partial_path)
+            raise
+        return count, skipped
+
+    def query_stats(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> dict:
+        """Aggregates over trips started in [start, end)"""
+        sums = self._prefix_sums.query(
+            start.timestamp() if start is not None else None,
+            end.timestamp() if end is not None else None,
+        )
+        average_speed = None
+        if sums["duration"] > 0:
+            average_speed = sums["distance"] / 1000 / (sums["duration"] / 3600)
+        return {
+            "distance": sums["distance"],
+            "duration": sums["duration"],
+            "vertical_gain": sums["vertical_gain"],
+            "trips": int(sums["count"]),
+            "night_trips": int(sums["night"]),
+            "average_speed": average_speed,
+        }
 
     async def _load_traces(self) -> Optional[list]:
         if self.data is not None:
@@ -157,27 +570,99 @@ class GeoveloAPICoordinator(DataUpdateCoordinator):
                 "No traces loaded from cache, it should only happen when installing this integration"
             )
             return None
-        traces = copy.deepcopy(traces)
-        for i, trace in enumerate(traces):
-            for key in self.COMPRESSED_KEYS:
-                if key in trace:
-                    self._decompress_key(trace, key, i)
-        return traces
-
-    async def _store_traces(self, traces):
-        compressed_traces = copy.deepcopy(traces)
-        for trace in compressed_traces:
-            for key in self.COMPRESSED_KEYS:
-                # we decide to remove those keys instead of compressing
-                # it saves data on disk
-                if key in trace:
-                    trace.pop(key)
+        return copy.deepcopy(traces)
+
+    async def _store_traces(self, traces) -> bool:
         try:
-            await self._custom_store.async_save(compressed_traces)
+            await self._custom_store.async_save(copy.deepcopy(traces))
         except Exception as e:
             _LOGGER.exception(
-                f"Error while caching traces: {e}, will re-query same data next time"
+                f"Error while caching traces: {e}, will retry on next refresh"
             )
+            return False
+        return True
+
+    async def _store_changes(self, traces):
+        """
+        Sync metadata is only written once traces are: stored hashes must describe stored traces,
+        otherwise edits would never be applied to the stored version after a restart
+        """
+        if self._traces_dirty:
+            if not await self._store_traces(traces):
+                return
+            self._traces_dirty = False
+        await self._store_sync_metadata()
+
+    def _build_data(self, traces: list, zones: list) -> dict:
+        if self.data is not None and zones != self.data["zones"]:
+            self._revision += 1
+        return {
+            "traces": traces,
+            "zones": zones,
+            "calendar": self._calendar,
+            "revision": self._revision,
+            "refresh_stats": dict(self._refresh_stats),
+        }
+
+    def _zones_due(self, now: datetime) -> bool:
+        """Zones only change with new trips, but we still refresh them from time to time"""
+        return (
+            self.data is None
+            or self._zones_stale
+            or self._zones_fetched_at is None
+            or now - self._zones_fetched_at > self.ZONES_MAX_AGE
+        )
+
+    def _zones_fetched(self, now: datetime):
+        # we don't need to store zones on disk, it's a single call
+        self._zones_fetched_at = now
+        self._zones_stale = False
+
+    async def _propagate_changes(
+        self,
+        geovelo_api: GeoveloApi,
+        traces: list,
+        changed: bool,
+        zones: list,
+        zones_fetched: bool,
+        now: datetime,
+    ) -> list:
+        """
+        Write changes to stores and statistics while zones are fetched, if new trips may have changed them.
+        Returns zones, the previous ones if they could not be fetched
+        """
+        if changed:
+            self._revision += 1
+            self._traces_dirty = True
+            if not zones_fetched:
+                self._zones_stale = True
+        self._import_statistics(traces)
+        if not self._zones_stale:
+            await self._store_changes(traces)
+            return zones
+        fetched_zones, _ = await asyncio.gather(
+            geovelo_api.get_zones(),
+            self._store_changes(traces),
+            return_exceptions=True,
+        )
+        if isinstance(fetched_zones, Exception):
+            # traces are merged already, zones will be fetched again on next refresh
+            _LOGGER.warning(f"Failed fetching geovelo zones: {fetched_zones}")
+            return zones
+        self._zones_fetched(now)
+        return fetched_zones
+
+    def _record_refresh(self, started: float, requests_before: int, saved: int):
+        self._refresh_stats["duration"] = round(time.monotonic() - started, 3)
+        self._refresh_stats["requests"] = self._api.request_count - requests_before
+        self._refresh_stats["requests_saved"] += saved
+        self._refresh_stats["connections_created"] = self._api.connection_stats["created"]
+        self._refresh_stats["connections_reused"] = self._api.connection_stats["reused"]
+        _LOGGER.debug(
+            f"Refresh took {self._refresh_stats['duration']}s with {self._refresh_stats['requests']} requests, "
+            f"{self._refresh_stats['requests_saved']} requests saved so far, "
+            f"connections: {self._api.connection_stats}"
+        )
 
     async def update_method(self):
         """Fetch geovelo data from API endpoint."""
@@ -189,54 +674,159 @@ class GeoveloAPICoordinator(DataUpdateCoordinator):
                 raise UpdateFailed(
                     "Failing update on purpose to test state restoration"
                 )
-            _LOGGER.debug("Starting collecting geovelo data")
-
-            username = self.config["username"]
-            password = self.config["password"]
-            user_id = self.config["user_id"]
+            async with self._refresh_lock:
+                return await self._full_refresh()
+        except Exception as err:
+            raise UpdateFailed(f"Error communicating with API: {err}")
 
-            start_date = datetime.now() - timedelta(days=360 * 10)
-            if "GEOVELO_FAST" in os.environ:
-                start_date = datetime.now() - timedelta(days=30)
-            end_date = datetime.now()
-            traces = []
-            try:
-                previous_data = await self._load_traces()
-                if previous_data is not None:
-                    traces = previous_data
-                    last = max([parse_date(trace["end_datetime"]) for trace in traces])
-                    # we assume nobody update their trips more than 1 week in the past
-                    start_date = last - timedelta(days=7)
-            except Exception as e:
-                _LOGGER.warn(
-                    f"Impossible to load previous traces from {self._custom_store.path}: {type(e).__name__} {e.args}"
+    async def _load_previous_traces(
+        self, now: datetime
+    ) -> Tuple[list, datetime, Optional[timedelta]]:
+        """
+        Returns known traces, the date to fetch traces from and the overlap window used,
+        None when the whole history is fetched
+        """
+        history_start = datetime.now() - timedelta(days=360 * 10)
+        if "GEOVELO_FAST" in os.environ:
+            history_start = datetime.now() - timedelta(days=30)
+        start_date = history_start
+        overlap = None
+        traces = []
+        try:
+            previous_data = await self._load_traces()
+            if previous_data is not None:
+                traces = previous_data
+                if self.data is None:
+                    self._index_traces(traces)
+                    await self._load_sync_metadata()
+                if self._last_end is not None:
+                    overlap = self._overlap_window(now)
+                    start_date = self._last_end - overlap
+                if self.data is None and any(
+                    "analytics" not in trace for trace in traces
+                ):
+                    _LOGGER.info(
+                        "Some traces have no analytics yet, fetching whole history once to compute them"
+                    )
+                    start_date = history_start
+                    overlap = None
+        except Exception as e:
+            _LOGGER.warn(
+                f"Impossible to load previous traces from {self._custom_store.path}: {type(e).__name__} {e.args}"
+            )
+        return traces, start_date, overlap
+
+    async def _full_refresh(self) -> dict:
+        _LOGGER.debug("Starting collecting geovelo data")
+        started = time.monotonic()
+        geovelo_api = self._api
+        requests_before = geovelo_api.request_count
+        now = datetime.now(tz=dt_util.get_default_time_zone())
+        zones = self.data["zones"] if self.data is not None else None
+        zones_due = self._zones_due(now)
+        try:
+            # reading the store does not depend on authentication
+            (traces, start_date, overlap), _ = await asyncio.gather(
+                self._load_previous_traces(now),
+                geovelo_api.authenticate(
+                    self.config["username"], self.config["password"]
+                ),
+            )
+            fetched_zones = None
+            if zones_due:
+                new_traces, fetched_zones = await asyncio.gather(
+                    geovelo_api.get_traces(start_date, datetime.now()),
+                    geovelo_api.get_zones(),
+                    return_exceptions=True,
                 )
+                if isinstance(new_traces, BaseException):
+                    raise new_traces
+            else:
+                new_traces = await geovelo_api.get_traces(start_date, datetime.now())
+        except GeoveloApiError as e:
+            raise UpdateFailed(f"Failed fetching geovelo data: {e}")
+        if isinstance(fetched_zones, BaseException):
+            # traces are still merged, zones stay due until they are fetched
+            _LOGGER.warning(f"Failed fetching geovelo zones: {fetched_zones}")
+        elif zones_due:
+            zones = fetched_zones
+            self._zones_fetched(now)
+
+        if overlap == self.MAX_OVERLAP:
+            self._last_wide_sync = now
+            self._sync_metadata_dirty = True
+        changed = self._merge_traces(traces, new_traces)
+        if overlap is None:
+            # traces deleted upstream will never get analytics, don't fetch the whole history for them again
+            for trace in traces:
+                if "analytics" not in trace:
+                    trace["analytics"] = {}
+                    changed = True
+        zones = await self._propagate_changes(
+            geovelo_api, traces, changed, zones, zones_due, now
+        )
+        if zones is None:
+            # traces are stored already, sensors cannot be built without zones though
+            raise UpdateFailed("Failed fetching geovelo zones")
 
-            session = async_get_clientsession(self.hass)
-            geovelo_api = GeoveloApi(session)
-            try:
-                await geovelo_api.authenticate(username, password)
-                new_traces = await geovelo_api.get_traces(start_date, end_date)
-            except GeoveloApiError as e:
-                raise UpdateFailed(f"Failed fetching geovelo traces: {e}")
-
-            existing_ids = {trace["id"] for trace in traces}
-            for new_trace in new_traces:
-                if new_trace["id"] not in existing_ids:
-                    existing_ids.add(new_trace["id"])
-                    traces.append(new_trace)
-            await self._store_traces(traces)
-
-            # we don't need to store zones on disk, it's a single call
-            try:
-                zones = await geovelo_api.get_zones()
-            except GeoveloApiError as e:
-                raise UpdateFailed(f"Failed fetching geovelo zones: {e}")
+        # zones were not requested, since no trip changed
+        saved = 0 if zones_due or changed else 1
+        self._record_refresh(started, requests_before, saved)
+        return self._build_data(traces, zones)
 
+    async def async_request_quick_refresh(self, raise_on_failure: bool = False):
+        """
+        Fetch only the latest trips. Concurrent and close requests are coalesced.
+        Failures are only logged, unless <raise_on_failure> is set: then a failure of the fetch
+        this call ran is raised. Calls coalesced into a running fetch, or delayed to the end of
+        the cooldown, return without waiting for it and do not raise
+        """
+        runs = self._quick_refresh_runs
+        await self._quick_refresh_debouncer.async_call()
+        ran = self._quick_refresh_runs != runs
+        if raise_on_failure and ran and self._quick_refresh_failure is not None:
+            raise HomeAssistantError(
+                f"Failed fetching latest geovelo traces: {self._quick_refresh_failure}"
+            )
 
-            return {"traces": traces, "zones": zones}
-        except Exception as err:
-            raise UpdateFailed(f"Error communicating with API: {err}")
+    async def _quick_refresh(self):
+        self._quick_refresh_runs += 1
+        if self.data is None:
+            # nothing is known yet, only a full refresh makes sense
+            await self.async_request_refresh()
+            return
+        async with self._refresh_lock:
+            _LOGGER.debug("Starting collecting latest geovelo traces")
+            started = time.monotonic()
+            geovelo_api = self._api
+            requests_before = geovelo_api.request_count
+            now = datetime.now(tz=dt_util.get_default_time_zone())
+            traces = self.data["traces"]
+            start_date = self._last_end or datetime.now()
+            try:
+                await geovelo_api.authenticate(
+                    self.config["username"], self.config["password"]
+                )
+                new_traces = await geovelo_api.get_latest_traces(
+                    start_date, datetime.now()
+                )
+                changed = self._merge_traces(traces, new_traces)
+                zones = await self._propagate_changes(
+                    geovelo_api, traces, changed, self.data["zones"], False, now
+                )
+            except Exception as e:
+                # the debouncer only applies its cooldown when the function returns
+                _LOGGER.exception(f"Failed fetching latest geovelo traces: {e}")
+                self._quick_refresh_failure = e
+                return
+            self._quick_refresh_failure = None
+            self._record_refresh(started, requests_before, 0)
+            self.async_set_updated_data(self._build_data(traces, zones))
+
+    async def async_shutdown(self) -> None:
+        await super().async_shutdown()
+        self._quick_refresh_debouncer.async_shutdown()
+        await self._api.close()
 
 
 class GeoveloUtilityMeterSensor(UtilityMeterSensor):
@@ -256,7 +846,11 @@ class GeoveloSensorEntityDescription(SensorEntityDescription):
     compute_value: Callable | None = None
     # additional hook to receive value computed by `compute_value`. Will be used mostly for achievements
     post_compute_value: Callable | None = None
+    # callable that will be called to compute state attributes
+    compute_attributes: Callable | None = None
     monthly_utility: bool = False
+    # state does not only depend on traces (current date, refresh metrics): recompute it on every update
+    always_update: bool = False
 
 
 class GeoveloSensorEntity(CoordinatorEntity, SensorEntity):
@@ -276,6 +870,7 @@ class GeoveloSensorEntity(CoordinatorEntity, SensorEntity):
         self._attr_unique_id = (
             f"{config_entry.data.get('user_id')}-sensor-{description.key}"
         )
+        self._computed_revision = None
 
         self._attr_device_info = DeviceInfo(
             name=f"Cycle for {config_entry.data.get('user_id')}",
@@ -314,12 +909,26 @@ class GeoveloSensorEntity(CoordinatorEntity, SensorEntity):
             )
             self._async_add_entities([monthly])
 
+    async def async_update(self) -> None:
+        """Called by homeassistant.update_entity, only fetch latest trips"""
+        if not self.enabled:
+            return
+        await self.coordinator.async_request_quick_refresh()
+
     @callback
     def _handle_coordinator_update(self) -> None:
         _LOGGER.debug(f"Receiving an update for {self.unique_id} sensor")
         if not self.coordinator.last_update_success:
             _LOGGER.debug("Last coordinator failed, assuming state has not changed")
             return
+        revision = self.coordinator.data["revision"]
+        if (
+            not self.entity_description.always_update
+            and self._computed_revision == revision
+        ):
+            _LOGGER.debug("Traces have not changed, assuming state has not changed")
+            return
+        self._computed_revision = revision
         if self.entity_description.compute_value is not None:
             self._attr_native_value = self.entity_description.compute_value(
                 self.coordinator.data
@@ -327,6 +936,10 @@ class GeoveloSensorEntity(CoordinatorEntity, SensorEntity):
             # post processing, possibly to create an event
             if self.entity_description.post_compute_value is not None:
                 self.entity_description.post_compute_value(self._attr_native_value)
+            if self.entity_description.compute_attributes is not None:
+                self._attr_extra_state_attributes = (
+                    self.entity_description.compute_attributes(self.coordinator.data)
+                )
             self.async_write_ha_state()
 
 
@@ -346,16 +959,44 @@ def average_speed(entries: list) -> Optional[float]:
     return total_distance / 1000 / (total_time / 3600)
 
 
-def count_nightowl(entries) -> int:
-    count = 0
-    for t in entries:
-        if "usertracegameprogress" not in t or t["usertracegameprogress"] is None:
-            continue
-        if "during_night" not in t["usertracegameprogress"]:
+def analytics_values(key, entries):
+    for el in entries:
+        value = (el.get("analytics") or {}).get(key)
+        if value is not None:
+            yield value
+
+
+def max_on_analytics(key, entries) -> Optional[float]:
+    return max(analytics_values(key, entries), default=None)
+
+
+def sum_on_analytics(key, entries) -> float:
+    return sum(analytics_values(key, entries))
+
+
+def moving_average_speed(entries: list) -> Optional[float]:
+    total_time = 0
+    weighted_speed = 0
+    for el in entries:
+        analytics = el.get("analytics") or {}
+        if analytics.get("moving_average_speed") is None:
             continue
-        if t["usertracegameprogress"]["during_night"]:
-            count += 1
-    return count
+        total_time += analytics["moving_time"]
+        weighted_speed += analytics["moving_average_speed"] * analytics["moving_time"]
+    if total_time == 0:
+        return None
+    return weighted_speed / total_time
+
+
+def connection_reuse_ratio(refresh_stats: dict) -> Optional[float]:
+    total = refresh_stats["connections_created"] + refresh_stats["connections_reused"]
+    if total == 0:
+        return None
+    return refresh_stats["connections_reused"] / total * 100
+
+
+def count_nightowl(entries) -> int:
+    return sum(1 for t in entries if is_night_trip(t))
 
 
 def compute_co2(entries):
@@ -364,19 +1005,44 @@ def compute_co2(entries):
     return sum_on_attribute("distance", entries) * CO2_PER_KM
 
 
-def consecutive_days(timezone, traces) -> Optional[int]:
+def consecutive_days(timezone, calendar: CyclingCalendar) -> int:
+    return calendar.current_streak(datetime.now(tz=timezone).date())
+
+
+def longest_streak(calendar: CyclingCalendar) -> int:
+    return calendar.longest_streak
+
+
+def days_cycled_this_year(timezone, calendar: CyclingCalendar) -> int:
+    return calendar.days_in_year(datetime.now(tz=timezone).year)
+
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+
+def weekday_frequency(timezone, calendar: CyclingCalendar) -> dict[str, float]:
     today = datetime.now(tz=timezone).date()
-    days_of_cycling = set()
-    for t in traces:
-        d = parse_date(t["start_datetime"]).date()
-        days_of_cycling.add(d)
-    last_day_cycled = max(days_of_cycling)
-    if today - last_day_cycled > timedelta(days=1):
-        return 0
-    checked_day = last_day_cycled
-    while checked_day in days_of_cycling:
-        checked_day -= timedelta(days=1)
-    return int((last_day_cycled - checked_day).total_seconds() / 3600 / 24)
+    frequencies = calendar.weekday_frequency(today)
+    return {
+        weekday: round(frequency, 3)
+        for weekday, frequency in zip(WEEKDAYS, frequencies)
+    }
+
+
+def favorite_weekday(timezone, calendar: CyclingCalendar) -> Optional[str]:
+    if len(calendar) == 0:
+        return None
+    frequencies = weekday_frequency(timezone, calendar)
+    return max(frequencies, key=frequencies.get)
+
 
 def explorer_achievement(hass, explored_zone_count):
     if explored_zone_count >= 1000:
@@ -481,6 +1147,16 @@ def onzones[F: Any](f: Callable[[list], F]) -> Callable[[dict], F]:
         return f(data["zones"])
     return w
 
+def oncalendar[F: Any](f: Callable[[CyclingCalendar], F]) -> Callable[[dict], F]:
+    def w(data: dict) -> F:
+        return f(data["calendar"])
+    return w
+
+def onrefreshstats[F: Any](f: Callable[[dict], F]) -> Callable[[dict], F]:
+    def w(data: dict) -> F:
+        return f(data["refresh_stats"])
+    return w
+
 def build_sensors(hass: HomeAssistant) -> list[GeoveloSensorEntityDescription]:
     return [
         GeoveloSensorEntityDescription(
@@ -524,11 +1200,43 @@ def build_sensors(hass: HomeAssistant) -> list[GeoveloSensorEntityDescription]:
             key="consecutive_days_of_cycling",
             name="Consecutive days of cycling",
             icon="mdi:medal",
-            compute_value=ontraces(partial(
+            compute_value=oncalendar(partial(
                 consecutive_days, dt_util.get_default_time_zone()
             )),
             post_compute_value=partial(non_stop_achievements, hass),
             state_class=SensorStateClass.TOTAL,
+            always_update=True,
+        ),
+        GeoveloSensorEntityDescription(
+            key="longest_streak_of_cycling",
+            name="Longest streak of cycling",
+            icon="mdi:trophy",
+            compute_value=oncalendar(longest_streak),
+            state_class=SensorStateClass.TOTAL,
+        ),
+        GeoveloSensorEntityDescription(
+            key="days_cycled_this_year",
+            name="Days cycled this year",
+            icon="mdi:calendar-check",
+            compute_value=oncalendar(partial(
+                days_cycled_this_year, dt_util.get_default_time_zone()
+            )),
+            state_class=SensorStateClass.TOTAL,
+            always_update=True,
+        ),
+        GeoveloSensorEntityDescription(
+            key="favorite_weekday",
+            name="Favorite cycling weekday",
+            icon="mdi:calendar-week",
+            device_class=SensorDeviceClass.ENUM,
+            options=WEEKDAYS,
+            compute_value=oncalendar(partial(
+                favorite_weekday, dt_util.get_default_time_zone()
+            )),
+            compute_attributes=oncalendar(partial(
+                weekday_frequency, dt_util.get_default_time_zone()
+            )),
+            always_update=True,
         ),
         GeoveloSensorEntityDescription(
             key="cycle_time",
@@ -558,6 +1266,84 @@ def build_sensors(hass: HomeAssistant) -> list[GeoveloSensorEntityDescription]:
             suggested_display_precision=0,
             state_class=SensorStateClass.MEASUREMENT,
         ),
+        GeoveloSensorEntityDescription(
+            key="top_speed",
+            name="Top speed",
+            icon="mdi:speedometer",
+            compute_value=ontraces(partial(max_on_analytics, "max_speed")),
+            device_class=SensorDeviceClass.SPEED,
+            native_unit_of_measurement="km/h",
+            suggested_display_precision=0,
+            state_class=SensorStateClass.MEASUREMENT,
+        ),
+        GeoveloSensorEntityDescription(
+            key="moving_average_speed",
+            name="Moving average speed",
+            compute_value=ontraces(moving_average_speed),
+            device_class=SensorDeviceClass.SPEED,
+            native_unit_of_measurement="km/h",
+            suggested_display_precision=0,
+            state_class=SensorStateClass.MEASUREMENT,
+        ),
+        GeoveloSensorEntityDescription(
+            key="moving_time",
+            name="Time moving",
+            compute_value=ontraces(partial(sum_on_analytics, "moving_time")),
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement="s",
+            state_class=SensorStateClass.TOTAL,
+        ),
+        GeoveloSensorEntityDescription(
+            key="max_gradient",
+            name="Steepest climb",
+            icon="mdi:slope-uphill",
+            compute_value=ontraces(partial(max_on_analytics, "max_gradient")),
+            native_unit_of_measurement="%",
+            suggested_display_precision=0,
+            state_class=SensorStateClass.MEASUREMENT,
+        ),
+        GeoveloSensorEntityDescription(
+            key="total_descent",
+            name="Total descent",
+            icon="mdi:slope-downhill",
+            compute_value=ontraces(partial(sum_on_analytics, "total_descent")),
+            device_class=SensorDeviceClass.DISTANCE,
+            native_unit_of_measurement="m",
+            monthly_utility=True,
+            state_class=SensorStateClass.TOTAL,
+        ),
+        GeoveloSensorEntityDescription(
+            key="refresh_duration",
+            name="Last refresh duration",
+            icon="mdi:timer-outline",
+            compute_value=onrefreshstats(itemgetter("duration")),
+            device_class=SensorDeviceClass.DURATION,
+            native_unit_of_measurement="s",
+            suggested_display_precision=1,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            always_update=True,
+        ),
+        GeoveloSensorEntityDescription(
+            key="requests_saved",
+            name="API requests saved",
+            icon="mdi:web-check",
+            compute_value=onrefreshstats(itemgetter("requests_saved")),
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            always_update=True,
+        ),
+        GeoveloSensorEntityDescription(
+            key="connection_reuse",
+            name="Reused connections",
+            icon="mdi:connection",
+            compute_value=onrefreshstats(connection_reuse_ratio),
+            native_unit_of_measurement="%",
+            suggested_display_precision=0,
+            state_class=SensorStateClass.MEASUREMENT,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            always_update=True,
+        ),
         GeoveloSensorEntityDescription(
             key="h3_zones",
             name="Explored zones",
@@ -589,6 +1375,7 @@ class GeoveloImageEntity(CoordinatorEntity, ImageEntity):
         self._attr_unique_id = (
             f"{config_entry.data.get('user_id')}-sensor-{description.key}"
         )
+        self._computed_revision = None
         self.image_url = None
 
         self._attr_device_info = DeviceInfo(
@@ -603,12 +1390,23 @@ class GeoveloImageEntity(CoordinatorEntity, ImageEntity):
             manufacturer="geovelo",
         )
 
+    async def async_update(self) -> None:
+        """Called by homeassistant.update_entity, only fetch latest trips"""
+        if not self.enabled:
+            return
+        await self.coordinator.async_request_quick_refresh()
+
     @callback
     def _handle_coordinator_update(self) -> None:
         _LOGGER.debug(f"Receiving an update for {self.unique_id} image")
         if not self.coordinator.last_update_success:
             _LOGGER.debug("Last coordinator failed, assuming state has not changed")
             return
+        revision = self.coordinator.data["revision"]
+        if self._computed_revision == revision:
+            _LOGGER.debug("Traces have not changed, assuming image has not changed")
+            return
+        self._computed_revision = revision
         if self.entity_description.compute_value is not None:
             (image_last_updated, image_url) = self.entity_description.compute_value(
                 self.coordinator.data
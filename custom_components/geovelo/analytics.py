@@ -0,0 +1,194 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+import numpy as np
+
+# below this speed (in km/h) the rider is considered stopped
+MOVING_SPEED_THRESHOLD = 3.0
+# horizontal distance (in m) over which gradients are measured, to smooth gps noise
+GRADIENT_WINDOW = 100.0
+
+
+class CyclingCalendar:
+    """Bitmap of cycled days, bit i is set when the user cycled on origin + i days"""
+
+    def __init__(self) -> None:
+        self._origin: Optional[date] = None
+        self._bits = 0
+        # length of the streak ending on the last cycled day
+        self._last_run = 0
+        self._longest_run = 0
+        self._days_per_year: dict[int, int] = {}
+        self._days_per_weekday = [0] * 7
+
+    def __len__(self) -> int:
+        return self._bits.bit_count()
+
+    @property
+    def first_day(self) -> Optional[date]:
+        return self._origin
+
+    @property
+    def last_day(self) -> Optional[date]:
+        if self._origin is None:
+            return None
+        return self._origin + timedelta(days=self._bits.bit_length() - 1)
+
+    def add(self, day: date) -> bool:
+        """
+        Mark <day> as cycled. Returns False if it was already known.
+        Streaks are maintained incrementally: adding a day can only merge runs
+        """
+        if self._origin is None:
+            self._origin = day
+        elif day < self._origin:
+            # traces are returned most recent first, so history grows backwards
+            self._bits <<= (self._origin - day).days
+            self._origin = day
+        i = (day - self._origin).days
+        if self._bits >> i & 1:
+            return False
+        self._bits |= 1 << i
+        self._days_per_year[day.year] = self._days_per_year.get(day.year, 0) + 1
+        self._days_per_weekday[day.weekday()] += 1
+
+        above = self._run_above(i)
+        run = self._run_below(i) + 1 + above
+        self._longest_run = max(self._longest_run, run)
+        if i + above == self._bits.bit_length() - 1:
+            self._last_run = run
+        return True
+
+    def _run_below(self, i: int) -> int:
+        """Number of consecutive cycled days right before bit i"""
+        gaps = ~self._bits & ((1 << i) - 1)
+        return i - gaps.bit_length()
+
+    def _run_above(self, i: int) -> int:
+        """Number of consecutive cycled days right after bit i"""
+        x = self._bits >> (i + 1)
+        return (~x & (x + 1)).bit_length() - 1
+
+    def current_streak(self, today: date) -> int:
+        last_day = self.last_day
+        if last_day is None or today - last_day > timedelta(days=1):
+            return 0
+        return self._last_run
+
+    @property
+    def longest_streak(self) -> int:
+        return self._longest_run
+
+    def days_in_year(self, year: int) -> int:
+        return self._days_per_year.get(year, 0)
+
+    def weekday_frequency(self, today: date) -> list[float]:
+        """Share of each weekday (monday first) cycled since the first trace"""
+        if self._origin is None or today < self._origin:
+            return [0.0] * 7
+        elapsed = (today - self._origin).days + 1
+        frequencies = []
+        for weekday, cycled in enumerate(self._days_per_weekday):
+            occurrences = elapsed // 7
+            if (weekday - self._origin.weekday()) % 7 < elapsed % 7:
+                occurrences += 1
+            frequencies.append(cycled / occurrences if occurrences else 0.0)
+        return frequencies
+
+
+class TracePrefixSums:
+    """
+    Prefix sums of trace metrics, ordered by start timestamp, to answer range queries in O(log n).
+    Sums of the first k traces are stored at index k
+    """
+
+    COLUMNS = ["distance", "duration", "vertical_gain", "count", "night"]
+
+    def __init__(self, entries: Iterable[Tuple[float, dict]] = ()) -> None:
+        self._starts = array("d")
+        self._sums = {column: array("d", [0.0]) for column in self.COLUMNS}
+        for start, values in sorted(entries, key=lambda entry: entry[0]):
+            self._append(start, values)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _append(self, start: float, values: dict):
+        self._starts.append(start)
+        for column, sums in self._sums.items():
+            sums.append(sums[-1] + values[column])
+
+    def extend(self, entries: Iterable[Tuple[float, dict]]):
+        """
+        Add traces. Traces more recent than all others are appended,
+        otherwise sums of the traces following the oldest added one are recomputed once
+        """
+        entries = sorted(entries, key=lambda entry: entry[0])
+        if len(entries) == 0:
+            return
+        position = bisect_right(self._starts, entries[0][0])
+        if position == len(self._starts):
+            for entry in entries:
+                self._append(*entry)
+            return
+        following = [
+            (
+                self._starts[k],
+                {
+                    column: sums[k + 1] - sums[k]
+                    for column, sums in self._sums.items()
+                },
+            )
+            for k in range(position, len(self._starts))
+        ]
+        del self._starts[position:]
+        for sums in self._sums.values():
+            del sums[position + 1 :]
+        for entry in merge(following, entries, key=lambda entry: entry[0]):
+            self._append(*entry)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> dict:
+        """Sums over traces started in [start, end)"""
+        i = 0 if start is None else bisect_left(self._starts, start)
+        j = len(self._starts) if end is None else bisect_left(self._starts, end)
+        j = max(i, j)
+        return {column: sums[j] - sums[i] for column, sums in self._sums.items()}
+
+
+def compute_trace_analytics(trace: dict) -> dict:
+    """
+    Derive compact statistics from the raw speeds and elevations of a trace.
+    Samples are assumed evenly spaced: over the trace duration for speeds
+    and over the trace distance for elevations
+    """
+    analytics = {
+        "max_speed": None,
+        "moving_time": None,
+        "moving_average_speed": None,
+        "max_gradient": None,
+        "total_descent": None,
+    }
+
+    speeds = np.asarray(trace.get("speeds") or [], dtype=float)
+    speeds = speeds[~np.isnan(speeds)]
+    if speeds.size > 0:
+        moving = speeds >= MOVING_SPEED_THRESHOLD
+        sample_duration = (trace.get("duration") or 0) / speeds.size
+        analytics["max_speed"] = float(speeds.max())
+        analytics["moving_time"] = float(np.count_nonzero(moving) * sample_duration)
+        if moving.any():
+            analytics["moving_average_speed"] = float(speeds[moving].mean())
+
+    elevations = np.asarray(trace.get("elevations") or [], dtype=float)
+    elevations = elevations[~np.isnan(elevations)]
+    if elevations.size > 1:
+        deltas = np.diff(elevations)
+        analytics["total_descent"] = float(-deltas[deltas < 0].sum())
+        step = (trace.get("distance") or 0) / (elevations.size - 1)
+        if step > 0:
+            window = min(max(1, round(GRADIENT_WINDOW / step)), elevations.size - 1)
+            climbs = elevations[window:] - elevations[:-window]
+            analytics["max_gradient"] = float(climbs.max() / (window * step) * 100)
+    return analytics
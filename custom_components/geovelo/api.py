@@ -1,4 +1,5 @@
 import logging
+import ssl
 import aiohttp
 from typing import Optional, Tuple
 from aiohttp.client import ClientTimeout
@@ -10,6 +11,15 @@ from urllib.parse import urlparse, urlunparse
 DEFAULT_TIMEOUT = 120
 CLIENT_TIMEOUT = ClientTimeout(total=DEFAULT_TIMEOUT)
 
+# a refresh only talks to backend.geovelo.fr, a few concurrent connections are enough
+CONNECTION_LIMIT = 4
+# a refresh makes several requests to the same host, no need to resolve it each time
+DNS_CACHE_TTL = 600
+# keep connections warm between requests of a refresh and close on-demand refreshes.
+# Hourly updates open new connections: servers usually drop idle ones after a minute or two,
+# holding sockets for an hour would mostly meet connections already closed on the other end
+KEEPALIVE_TIMEOUT = 90
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -21,14 +31,64 @@ API_KEY = "0f8c781a-b4b4-4d19-b931-1e82f22e769f"  # this api key does not seem t
 
 
 class GeoveloApi:
-    """Api to get data from geovelo"""
+    """
+    Api to get data from geovelo.
+    Without a session, a dedicated pooled one is created, and closed by `close` or when used as a context manager
+    """
 
     def __init__(
-        self, session: Optional[aiohttp.ClientSession] = None, timeout=CLIENT_TIMEOUT
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        timeout=CLIENT_TIMEOUT,
+        ssl_context: ssl.SSLContext | bool = True,
     ) -> None:
         self._timeout = timeout
-        self._session = session or aiohttp.ClientSession()
         self._user_id = None
+        # number of http requests sent, for monitoring purposes
+        self.request_count = 0
+        # only collected on the dedicated session
+        self.connection_stats = {
+            "created": 0,
+            "reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+        self._owns_session = session is None
+        if session is None:
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ssl=ssl_context,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[self._trace_config()]
+            )
+        self._session = session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        def count(stat):
+            async def hook(session, context, params):
+                self.connection_stats[stat] += 1
+
+            return hook
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(count("created"))
+        trace_config.on_connection_reuseconn.append(count("reused"))
+        trace_config.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace_config.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace_config
+
+    async def close(self):
+        if self._owns_session and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> "GeoveloApi":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
 
     @property
     def user_id(self) -> Optional[int]:
@@ -54,22 +114,37 @@ class GeoveloApi:
             "Referer": "https://www.geovelo.fr/",
             "Content-Length": "0",
         }
-        resp = await self._session.post(url, headers=headers)
-        if resp.status != 200:
-            raise GeoveloApiError(
-                f"Unable to get authorization token for {username}. Status was {resp.status}"
-            )
-
-        _LOGGER.debug(f"Got auth data from geovelo ✅")
-        self._user_id = resp.headers["userid"]
-        self._authorization_header = resp.headers["Authorization"]
+        self.request_count += 1
+        async with self._session.post(
+            url, headers=headers, timeout=self._timeout
+        ) as resp:
+            # reading the body lets the connection go back to the pool
+            await resp.read()
+            if resp.status != 200:
+                raise GeoveloApiError(
+                    f"Unable to get authorization token for {username}. Status was {resp.status}"
+                )
+
+            _LOGGER.debug(f"Got auth data from geovelo ✅")
+            self._user_id = resp.headers["userid"]
+            self._authorization_header = resp.headers["Authorization"]
+
+    def _traces_url(self, start_date, end_date) -> str:
+        return f"{GEOVELO_API_URL}/api/v6/users/{self._user_id}/traces?period=custom&date_start={start_date.strftime('%d-%m-%Y')}&date_end={end_date.strftime('%d-%m-%Y')}&ordering=-start_datetime&page=1&page_size=50"
 
     async def get_traces(self, start_date, end_date) -> list:
         """All traces in the selected time period"""
-        url = f"{GEOVELO_API_URL}/api/v6/users/{self._user_id}/traces?period=custom&date_start={start_date.strftime('%d-%m-%Y')}&date_end={end_date.strftime('%d-%m-%Y')}&ordering=-start_datetime&page=1&page_size=50"
+        url = self._traces_url(start_date, end_date)
         _LOGGER.debug(f"Will contact {url} to get traces")
         return await self.fetch_next(url)
 
+    async def get_latest_traces(self, start_date, end_date) -> list:
+        """Most recent traces in the selected time period, without following next pages"""
+        url = self._traces_url(start_date, end_date)
+        _LOGGER.debug(f"Will contact {url} to get latest traces")
+        data = await self.fetch_page(url)
+        return data["results"]
+
     def headers(self) -> dict:
         return {
             "Api-Key": API_KEY,
@@ -78,17 +153,22 @@ class GeoveloApi:
             "User-Agent": "https://github.com/kamaradclimber/geovelo-homeassistant",
         }
 
-    async def fetch_next(self, url) -> list:
+    async def fetch_page(self, url) -> dict:
+        self.request_count += 1
+        async with self._session.get(
+            url, headers=self.headers(), timeout=self._timeout
+        ) as resp:
+            if resp.status != 200:
+                d = await resp.text()
+                _LOGGER.debug(f"Failure {resp}: {d}")
+                raise GeoveloApiError(
+                    f"Unable to get traces for {self._user_id}, response code was {resp.status}"
+                )
 
-        resp = await self._session.get(url, headers=self.headers())
-        if resp.status != 200:
-            d = await resp.text()
-            _LOGGER.debug(f"Failure {resp}: {d}")
-            raise GeoveloApiError(
-                f"Unable to get traces for {self._user_id}, response code was {resp.status}"
-            )
+            return await resp.json()
 
-        data = await resp.json()
+    async def fetch_next(self, url) -> list:
+        data = await self.fetch_page(url)
         # _LOGGER.debug("Got geovelo data : %s ", data)
         traces = []
         if data["next"] is not None:
@@ -104,13 +184,16 @@ class GeoveloApi:
 
     async def get_zones(self) -> list:
         url = f"{GEOVELO_API_URL}/api/v1/users/{self._user_id}/h3_zones"
-        resp = await self._session.get(url, headers=self.headers())
-        if resp.status != 200:
-            d = await resp.text()
-            _LOGGER.debug(f"Failure {resp}: {d}")
-            raise GeoveloApiError(
-                f"Unable to get user zones for {self._user_id}, response code was {resp.status}"
-            )
-
-        data = await resp.json()
+        self.request_count += 1
+        async with self._session.get(
+            url, headers=self.headers(), timeout=self._timeout
+        ) as resp:
+            if resp.status != 200:
+                d = await resp.text()
+                _LOGGER.debug(f"Failure {resp}: {d}")
+                raise GeoveloApiError(
+                    f"Unable to get user zones for {self._user_id}, response code was {resp.status}"
+                )
+
+            data = await resp.json()
         return data
@@ -55,9 +55,9 @@ class SetupConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             self.data["username"] = user_input["username"]
             self.data["password"] = user_input["password"]
-            api = GeoveloApi()
-            await api.authenticate(user_input["username"], user_input["password"])
-            self.data["user_id"] = api.user_id
+            async with GeoveloApi(async_get_clientsession(self.hass)) as api:
+                await api.authenticate(user_input["username"], user_input["password"])
+                self.data["user_id"] = api.user_id
             return self.async_create_entry(title="geovelo", data=self.data)
 
         return self._show_setup_form("user", user_input, CREDS_SCHEMA, errors)
@@ -0,0 +1,117 @@
+import base64
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+from xml.sax.saxutils import escape
+
+EXPORT_FORMATS = ["csv", "jsonl", "gpx"]
+
+CSV_COLUMNS = [
+    "id",
+    "title",
+    "start_datetime",
+    "end_datetime",
+    "distance",
+    "duration",
+    "vertical_gain",
+    "during_night",
+    "max_speed",
+    "moving_time",
+    "moving_average_speed",
+    "max_gradient",
+    "total_descent",
+]
+
+GPX_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="https://github.com/kamaradclimber/geovelo-homeassistant" xmlns="http://www.topografix.com/GPX/1/1">
+"""
+
+
+def _csv_row(trace: dict) -> list:
+    analytics = trace.get("analytics") or {}
+    progress = trace.get("usertracegameprogress") or {}
+    row = []
+    for column in CSV_COLUMNS:
+        if column in analytics:
+            row.append(analytics[column])
+        elif column == "during_night":
+            row.append(progress.get("during_night"))
+        else:
+            row.append(trace.get(column))
+    return ["" if value is None else value for value in row]
+
+
+def _geometry(trace: dict):
+    """Geometry is kept compressed: gzipped json, base64 encoded"""
+    geometry = trace.get("geometry")
+    if isinstance(geometry, str):
+        geometry = json.loads(gzip.decompress(base64.b64decode(geometry.encode())))
+    return geometry
+
+
+def _gpx_track(trace: dict) -> str:
+    lines = [
+        "  <trk>",
+        f"    <name>{escape(str(trace.get('title') or trace['id']))}</name>",
+        f"    <desc>{escape(trace['start_datetime'])} - {escape(trace['end_datetime'])}</desc>",
+    ]
+    geometry = _geometry(trace)
+    if isinstance(geometry, dict) and geometry.get("coordinates"):
+        lines.append("    <trkseg>")
+        for point in geometry["coordinates"]:
+            lines.append(f'      <trkpt lat="{point[1]}" lon="{point[0]}"/>')
+        lines.append("    </trkseg>")
+    lines.append("  </trk>")
+    return "\n".join(lines) + "\n"
+
+
+def _json_line(trace: dict) -> str:
+    if "geometry" in trace:
+        trace = {**trace, "geometry": _geometry(trace)}
+    return json.dumps(trace) + "\n"
+
+
+def export_header(export_format: str) -> str:
+    if export_format == "csv":
+        output = io.StringIO()
+        csv.writer(output).writerow(CSV_COLUMNS)
+        return output.getvalue()
+    if export_format == "gpx":
+        return GPX_HEADER
+    return ""
+
+
+def export_traces(export_format: str, traces: list) -> str:
+    """Serialize a chunk of traces"""
+    if export_format == "csv":
+        output = io.StringIO()
+        csv.writer(output).writerows(_csv_row(trace) for trace in traces)
+        return output.getvalue()
+    if export_format == "gpx":
+        return "".join(_gpx_track(trace) for trace in traces)
+    return "".join(_json_line(trace) for trace in traces)
+
+
+def export_footer(export_format: str) -> str:
+    if export_format == "gpx":
+        return "</gpx>\n"
+    return ""
+
+
+def write_export(path: str, content: str, mode: str = "a"):
+    """Blocking write, to be run in the executor"""
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(content)
+
+
+def write_export_traces(path: str, export_format: str, traces: list):
+    """Serialize and append a chunk of traces, decompressing geometries is blocking too"""
+    write_export(path, export_traces(export_format, traces))
+
+
+def remove_export(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
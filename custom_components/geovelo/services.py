@@ -0,0 +1,158 @@
+import os
+import logging
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from typing import Optional
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+from .const import DOMAIN
+from .export import EXPORT_FORMATS
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_EXPORT_TRACES = "export_traces"
+SERVICE_REFRESH = "refresh"
+SERVICE_QUERY_STATS = "query_stats"
+
+EXPORT_TRACES_SCHEMA = vol.Schema(
+    {
+        vol.Optional("user_id"): cv.string,
+        vol.Optional("start"): cv.date,
+        vol.Optional("end"): cv.date,
+        vol.Optional("format", default="csv"): vol.In(EXPORT_FORMATS),
+    }
+)
+
+REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional("user_id"): cv.string,
+    }
+)
+
+QUERY_STATS_SCHEMA = vol.Schema(
+    {
+        vol.Optional("user_id"): cv.string,
+        vol.Optional("start"): vol.Any(cv.date, cv.datetime),
+        vol.Optional("end"): vol.Any(cv.date, cv.datetime),
+    }
+)
+
+
+def _coordinators(hass: HomeAssistant, call: ServiceCall) -> list:
+    """Coordinators targeted by a service call, all accounts when no user_id is given"""
+    coordinators = [
+        entry["geovelo_coordinator"]
+        for entry in hass.data.get(DOMAIN, {}).values()
+        if "geovelo_coordinator" in entry
+    ]
+    user_id = call.data.get("user_id")
+    if user_id is not None:
+        coordinators = [
+            coordinator
+            for coordinator in coordinators
+            if str(coordinator.config["user_id"]) == user_id
+        ]
+    if len(coordinators) == 0:
+        raise ServiceValidationError(f"No geovelo account found for {call.data}")
+    return coordinators
+
+
+async def _export_traces(hass: HomeAssistant, call: ServiceCall):
+    start = call.data.get("start")
+    end = call.data.get("end")
+    export_format = call.data["format"]
+    directory = hass.config.path(DOMAIN)
+    await hass.async_add_executor_job(partial(os.makedirs, directory, exist_ok=True))
+    files = []
+    for coordinator in _coordinators(hass, call):
+        user_id = coordinator.config["user_id"]
+        filename = f"traces_{user_id}_{start or 'first'}_{end or 'last'}.{export_format}"
+        path = os.path.join(directory, filename)
+        count, skipped = await coordinator.async_export_traces(
+            path, export_format, start, end
+        )
+        _LOGGER.info(f"Exported {count} traces of {user_id} to {path}")
+        if skipped > 0:
+            _LOGGER.warning(
+                f"Skipped {skipped} traces of {user_id} whose route is unknown"
+            )
+        files.append(
+            {"user_id": user_id, "path": path, "traces": count, "skipped": skipped}
+        )
+    return {"files": files}
+
+
+async def _refresh(hass: HomeAssistant, call: ServiceCall):
+    for coordinator in _coordinators(hass, call):
+        await coordinator.async_request_quick_refresh(raise_on_failure=True)
+
+
+def _as_datetime(value: Optional[date], end: bool = False) -> Optional[datetime]:
+    """Dates cover whole days, so an end date is included"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=dt_util.get_default_time_zone())
+        return value
+    if end:
+        value += timedelta(days=1)
+    return datetime.combine(value, time(), tzinfo=dt_util.get_default_time_zone())
+
+
+@callback
+def _query_stats(hass: HomeAssistant, call: ServiceCall):
+    start = _as_datetime(call.data.get("start"))
+    end = _as_datetime(call.data.get("end"), end=True)
+    return {
+        str(coordinator.config["user_id"]): coordinator.query_stats(start, end)
+        for coordinator in _coordinators(hass, call)
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+    if hass.services.has_service(DOMAIN, SERVICE_EXPORT_TRACES):
+        return
+
+    async def export_traces(call: ServiceCall):
+        return await _export_traces(hass, call)
+
+    async def refresh(call: ServiceCall):
+        await _refresh(hass, call)
+
+    @callback
+    def query_stats(call: ServiceCall):
+        return _query_stats(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_TRACES,
+        export_traces,
+        schema=EXPORT_TRACES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REFRESH,
+        refresh,
+        schema=REFRESH_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_STATS,
+        query_stats,
+        schema=QUERY_STATS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+@callback
+def async_unload_services(hass: HomeAssistant):
+    hass.services.async_remove(DOMAIN, SERVICE_EXPORT_TRACES)
+    hass.services.async_remove(DOMAIN, SERVICE_REFRESH)
+    hass.services.async_remove(DOMAIN, SERVICE_QUERY_STATS)
@@ -0,0 +1,111 @@
+import logging
+from datetime import date, datetime, time, tzinfo
+from typing import Iterable, Optional, Tuple
+
+from homeassistant.const import MAJOR_VERSION, MINOR_VERSION
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# maximum number of rows sent to the recorder at once
+STATISTICS_BATCH_SIZE = 1000
+
+# metadata has mean_type since 2025.4 and unit_class since 2025.10, older versions reject them
+HAS_MEAN_TYPE = (MAJOR_VERSION, MINOR_VERSION) >= (2025, 4)
+HAS_UNIT_CLASS = (MAJOR_VERSION, MINOR_VERSION) >= (2025, 10)
+if HAS_MEAN_TYPE:
+    from homeassistant.components.recorder.models import StatisticMeanType
+
+# metric -> (name, unit, unit class)
+DAILY_METRICS = {
+    "distance": ("Cycled distance", "m", "distance"),
+    "duration": ("Time cycling", "s", "duration"),
+    "trips": ("Trips", None, None),
+    "vertical_gain": ("Vertical gain", "m", "distance"),
+}
+
+
+def trace_metrics(trace: dict) -> dict:
+    return {
+        "distance": trace["distance"] or 0,
+        "duration": trace["duration"] or 0,
+        "trips": 1,
+        "vertical_gain": trace.get("vertical_gain") or 0,
+    }
+
+
+def day_start(day: date, timezone: tzinfo) -> datetime:
+    return datetime.combine(day, time(), tzinfo=timezone)
+
+
+def daily_statistics(
+    traces: Iterable[Tuple[date, dict]],
+    timezone: tzinfo,
+    first_day: Optional[date],
+    dirty_days: set[date],
+    base: Optional[dict] = None,
+) -> dict[str, list[StatisticData]]:
+    """
+    Daily rows, per metric, for days starting at <first_day> which have trips or are in <dirty_days>.
+    Days are in <timezone>. Sums are cumulative since the first trip: <base> holds the sums of trips
+    before <first_day>, traces before that day are ignored
+    """
+    days: dict[date, dict] = {day: {} for day in dirty_days}
+    for day, trace in traces:
+        if first_day is not None and day < first_day:
+            continue
+        totals = days.setdefault(day, {})
+        for metric, value in trace_metrics(trace).items():
+            totals[metric] = totals.get(metric, 0) + value
+
+    rows = {metric: [] for metric in DAILY_METRICS}
+    sums = {metric: 0 for metric in DAILY_METRICS}
+    if base is not None:
+        sums.update(base)
+    for day in sorted(days):
+        if first_day is not None and day < first_day:
+            continue
+        start = day_start(day, timezone)
+        for metric in DAILY_METRICS:
+            value = days[day].get(metric, 0)
+            sums[metric] += value
+            rows[metric].append(StatisticData(start=start, state=value, sum=sums[metric]))
+    return rows
+
+
+def statistic_id(user_id, metric: str) -> str:
+    return f"{DOMAIN}:{metric}_{user_id}".lower()
+
+
+@callback
+def async_import_daily_statistics(
+    hass: HomeAssistant, user_id, rows: dict[str, list[StatisticData]]
+):
+    """Queue daily rows in the recorder as external statistics"""
+    for metric, metric_rows in rows.items():
+        if len(metric_rows) == 0:
+            continue
+        name, unit, unit_class = DAILY_METRICS[metric]
+        metadata = StatisticMetaData(
+            has_sum=True,
+            name=f"{name} ({user_id})",
+            source=DOMAIN,
+            statistic_id=statistic_id(user_id, metric),
+            unit_of_measurement=unit,
+        )
+        if HAS_MEAN_TYPE:
+            metadata["mean_type"] = StatisticMeanType.NONE
+        else:
+            metadata["has_mean"] = False
+        if HAS_UNIT_CLASS:
+            metadata["unit_class"] = unit_class
+        for i in range(0, len(metric_rows), STATISTICS_BATCH_SIZE):
+            async_add_external_statistics(
+                hass, metadata, metric_rows[i : i + STATISTICS_BATCH_SIZE]
+            )
+        _LOGGER.debug(
+            f"Queued {len(metric_rows)} daily {metric} statistics for {user_id}"
+        )
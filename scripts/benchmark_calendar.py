@@ -0,0 +1,82 @@
+"""
+Time the former set based `consecutive_days` against `CyclingCalendar`.
+Correctness of the calendar is covered by tests/test_analytics.py
+
+Run from the repository root: python scripts/benchmark_calendar.py
+"""
+import importlib.util
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+ANALYTICS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "custom_components", "geovelo", "analytics.py"
+)
+spec = importlib.util.spec_from_file_location("analytics", ANALYTICS_PATH)
+analytics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analytics)
+
+
+def parse_date(string):
+    try:
+        return datetime.strptime(string, "%Y-%m-%dT%H:%M:%S.%f%z")
+    except Exception:
+        return datetime.strptime(string, "%Y-%m-%dT%H:%M:%S%z")
+
+
+def trace_day(trace) -> date:
+    return parse_date(trace["start_datetime"]).date()
+
+
+def former_consecutive_days(tz, traces):
+    """Implementation used before the calendar, rebuilt from every trace on each poll"""
+    today = datetime.now(tz=tz).date()
+    days_of_cycling = set()
+    for t in traces:
+        days_of_cycling.add(trace_day(t))
+    last_day_cycled = max(days_of_cycling)
+    if today - last_day_cycled > timedelta(days=1):
+        return 0
+    checked_day = last_day_cycled
+    while checked_day in days_of_cycling:
+        checked_day -= timedelta(days=1)
+    return int((last_day_cycled - checked_day).total_seconds() / 3600 / 24)
+
+
+def make_trace(day: date) -> dict:
+    return {"start_datetime": day.strftime("%Y-%m-%dT08:12:00.000+0000")}
+
+
+def benchmark(today: date, count: int):
+    # one ride every ~2 days over 10 years, most recent first like the api
+    traces = [
+        make_trace(today - timedelta(days=i * 3650 // count)) for i in range(count)
+    ]
+
+    started = time.perf_counter()
+    former_consecutive_days(timezone.utc, traces)
+    former = time.perf_counter() - started
+
+    started = time.perf_counter()
+    calendar = analytics.CyclingCalendar()
+    for trace in traces:
+        calendar.add(trace_day(trace))
+    build = time.perf_counter() - started
+
+    # a poll brings one new trace
+    started = time.perf_counter()
+    calendar.add(trace_day(make_trace(today)))
+    calendar.current_streak(today)
+    poll = time.perf_counter() - started
+
+    print(
+        f"{count:>6} traces: former per poll {former * 1e3:8.2f} ms | "
+        f"calendar initial build {build * 1e3:8.2f} ms | "
+        f"calendar per poll {poll * 1e6:6.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    today = datetime.now(timezone.utc).date()
+    for count in (1500, 10000, 100000):
+        benchmark(today, count)
@@ -0,0 +1 @@
+"""Tests for the geovelo integration"""
@@ -0,0 +1,39 @@
+import copy
+from datetime import timedelta
+from unittest.mock import AsyncMock
+
+from homeassistant.util import dt as dt_util
+
+CONFIG = {"username": "user", "password": "password", "user_id": 42}
+TRACES_KEY = "geovelo_traces_42"
+SYNC_KEY = "geovelo_sync_42"
+
+
+def make_trace(trace_id, days_ago: float, distance=1000, **kwargs) -> dict:
+    start = dt_util.now() - timedelta(days=days_ago)
+    trace = {
+        "id": trace_id,
+        "title": f"Trip {trace_id}",
+        "start_datetime": start.strftime("%Y-%m-%dT%H:%M:%S.%f%z"),
+        "end_datetime": (start + timedelta(minutes=20)).strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "distance": distance,
+        "duration": 1200,
+        "vertical_gain": 10,
+        "speeds": [0, 10, 20, 15],
+        "elevations": [1, 2, 3, 2, 1],
+        "usertracegameprogress": {"during_night": False},
+    }
+    trace.update(kwargs)
+    return trace
+
+
+class FakeGeovelo:
+    """Traces known by geovelo, most recent first like the api"""
+
+    def __init__(self):
+        self.traces = []
+        self.get_traces = AsyncMock(side_effect=self._get_traces)
+        self.get_zones = AsyncMock(return_value=[])
+
+    async def _get_traces(self, start_date, end_date):
+        return copy.deepcopy(self.traces)
@@ -0,0 +1,40 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.geovelo import GeoveloAPICoordinator
+from custom_components.geovelo.api import GeoveloApi
+
+from .common import CONFIG, FakeGeovelo
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+def geovelo():
+    fake = FakeGeovelo()
+    with (
+        patch.object(GeoveloApi, "authenticate", AsyncMock()),
+        patch.object(GeoveloApi, "get_traces", fake.get_traces),
+        patch.object(GeoveloApi, "get_zones", fake.get_zones),
+    ):
+        yield fake
+
+
+@pytest.fixture
+async def coordinators(hass: HomeAssistant):
+    """Build coordinators, a new one simulates a restart"""
+    created = []
+
+    def build():
+        coordinator = GeoveloAPICoordinator(hass, CONFIG)
+        created.append(coordinator)
+        return coordinator
+
+    yield build
+    for coordinator in created:
+        await coordinator.async_shutdown()
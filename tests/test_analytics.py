@@ -0,0 +1,225 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from custom_components.geovelo.analytics import (
+    CyclingCalendar,
+    TracePrefixSums,
+    compute_trace_analytics,
+)
+
+TODAY = date(2024, 3, 15)
+
+
+def random_days(rng: random.Random) -> set[date]:
+    return {
+        TODAY - timedelta(days=rng.randint(0, 400))
+        for _ in range(rng.randint(1, 120))
+    }
+
+
+def longest_run(days: set[date]) -> int:
+    longest = 0
+    for day in days:
+        if day - timedelta(days=1) in days:
+            continue
+        run = 0
+        while day + timedelta(days=run) in days:
+            run += 1
+        longest = max(longest, run)
+    return longest
+
+
+def current_run(days: set[date], today: date) -> int:
+    day = max(days)
+    if today - day > timedelta(days=1):
+        return 0
+    run = 0
+    while day - timedelta(days=run) in days:
+        run += 1
+    return run
+
+
+def weekday_frequency(days: set[date], today: date) -> list[float]:
+    first = min(days)
+    elapsed = [first + timedelta(days=i) for i in range((today - first).days + 1)]
+    return [
+        sum(day in days for day in elapsed if day.weekday() == weekday)
+        / sum(day.weekday() == weekday for day in elapsed)
+        for weekday in range(7)
+    ]
+
+
+def test_empty_calendar():
+    calendar = CyclingCalendar()
+
+    assert len(calendar) == 0
+    assert calendar.first_day is None
+    assert calendar.last_day is None
+    assert calendar.current_streak(TODAY) == 0
+    assert calendar.longest_streak == 0
+    assert calendar.weekday_frequency(TODAY) == [0.0] * 7
+
+
+def test_add_known_day():
+    calendar = CyclingCalendar()
+
+    assert calendar.add(TODAY)
+    assert not calendar.add(TODAY)
+    assert len(calendar) == 1
+    assert calendar.days_in_year(TODAY.year) == 1
+
+
+def test_history_growing_backwards():
+    calendar = CyclingCalendar()
+    # traces are returned most recent first
+    for i in range(5):
+        calendar.add(TODAY - timedelta(days=i))
+
+    assert calendar.first_day == TODAY - timedelta(days=4)
+    assert calendar.last_day == TODAY
+    assert calendar.current_streak(TODAY) == 5
+    assert calendar.longest_streak == 5
+
+
+@pytest.mark.parametrize(
+    "last_ride,streak", [(0, 3), (1, 3), (2, 0)], ids=["today", "yesterday", "older"]
+)
+def test_current_streak_ends_on_a_recent_day(last_ride, streak):
+    calendar = CyclingCalendar()
+    for i in range(3):
+        calendar.add(TODAY - timedelta(days=last_ride + i))
+
+    assert calendar.current_streak(TODAY) == streak
+
+
+def test_gap_filled_merges_runs():
+    calendar = CyclingCalendar()
+    for i in [0, 1, 3, 4, 5]:
+        calendar.add(TODAY - timedelta(days=i))
+    assert calendar.current_streak(TODAY) == 2
+    assert calendar.longest_streak == 3
+
+    calendar.add(TODAY - timedelta(days=2))
+
+    assert calendar.current_streak(TODAY) == 6
+    assert calendar.longest_streak == 6
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_history(seed):
+    rng = random.Random(seed)
+    days = random_days(rng)
+    ordered = list(days)
+    rng.shuffle(ordered)
+    calendar = CyclingCalendar()
+    for day in ordered:
+        calendar.add(day)
+
+    assert len(calendar) == len(days)
+    assert calendar.first_day == min(days)
+    assert calendar.last_day == max(days)
+    assert calendar.current_streak(TODAY) == current_run(days, TODAY)
+    assert calendar.longest_streak == longest_run(days)
+    for year in (2022, 2023, 2024):
+        assert calendar.days_in_year(year) == sum(day.year == year for day in days)
+    assert calendar.weekday_frequency(TODAY) == pytest.approx(
+        weekday_frequency(days, TODAY)
+    )
+
+
+def entry(start: float, distance: float = 1) -> tuple[float, dict]:
+    return (
+        start,
+        {
+            "distance": distance,
+            "duration": 10,
+            "vertical_gain": 0,
+            "count": 1,
+            "night": 0,
+        },
+    )
+
+
+def test_prefix_sums_ranges_exclude_end():
+    sums = TracePrefixSums([entry(20, 2), entry(10, 1), entry(30, 3)])
+
+    assert sums.query()["distance"] == 6
+    assert sums.query(10, 30)["distance"] == 3
+    assert sums.query(10, 30.5)["distance"] == 6
+    assert sums.query(end=10)["distance"] == 0
+    assert sums.query(30)["distance"] == 3
+    assert sums.query(31)["count"] == 0
+    # empty when the range is reversed
+    assert sums.query(30, 10)["count"] == 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_prefix_sums_extended_out_of_order(seed):
+    rng = random.Random(seed)
+    starts = [float(rng.randint(0, 100)) for _ in range(rng.randint(1, 60))]
+    sums = TracePrefixSums()
+    batches = [starts[i : i + 7] for i in range(0, len(starts), 7)]
+    for batch in batches:
+        sums.extend(entry(start, start) for start in batch)
+
+    assert len(sums) == len(starts)
+    for _ in range(20):
+        start, end = sorted(float(rng.randint(-5, 105)) for _ in range(2))
+        queried = sums.query(start, end)
+        assert queried["count"] == sum(start <= s < end for s in starts)
+        assert queried["distance"] == sum(s for s in starts if start <= s < end)
+
+
+def test_analytics_without_samples():
+    assert compute_trace_analytics({"duration": 600, "distance": 2000}) == {
+        "max_speed": None,
+        "moving_time": None,
+        "moving_average_speed": None,
+        "max_gradient": None,
+        "total_descent": None,
+    }
+
+
+def test_speed_analytics():
+    analytics = compute_trace_analytics(
+        {"duration": 1200, "speeds": [0, 10, float("nan"), 20, 15, 2]}
+    )
+
+    assert analytics["max_speed"] == 20
+    # nan samples are dropped, 3 of the 5 remaining samples are above the moving threshold
+    assert analytics["moving_time"] == pytest.approx(1200 * 3 / 5)
+    assert analytics["moving_average_speed"] == pytest.approx(15)
+
+
+def test_speed_analytics_when_stopped():
+    analytics = compute_trace_analytics({"duration": 60, "speeds": [0, 1, 2]})
+
+    assert analytics["max_speed"] == 2
+    assert analytics["moving_time"] == 0
+    assert analytics["moving_average_speed"] is None
+
+
+def test_elevation_analytics():
+    # a sample every 50m: 1m up per sample, then 2m down per sample
+    elevations = [0, 1, 2, 3, 4, 2, 0]
+    analytics = compute_trace_analytics({"distance": 300, "elevations": elevations})
+
+    assert analytics["total_descent"] == pytest.approx(4)
+    # measured over 100m, 2 samples: 2m up
+    assert analytics["max_gradient"] == pytest.approx(2)
+
+
+def test_gradient_window_capped_by_trace_length():
+    analytics = compute_trace_analytics({"distance": 40, "elevations": [10, 12]})
+
+    assert analytics["max_gradient"] == pytest.approx(5)
+    assert analytics["total_descent"] == 0
+
+
+def test_gradient_unknown_without_distance():
+    analytics = compute_trace_analytics({"distance": 0, "elevations": [10, 8, 9]})
+
+    assert analytics["max_gradient"] is None
+    assert analytics["total_descent"] == pytest.approx(2)
@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from custom_components.geovelo import GeoveloAPICoordinator, trace_hash
+from custom_components.geovelo.api import GeoveloApiError
+
+from .common import SYNC_KEY, TRACES_KEY, FakeGeovelo, make_trace
+
+
+def fetched_since(geovelo: FakeGeovelo) -> timedelta:
+    start_date = geovelo.get_traces.await_args.args[0]
+    return datetime.now() - start_date.replace(tzinfo=None)
+
+
+def distances(coordinator) -> dict:
+    return {trace["id"]: trace["distance"] for trace in coordinator.data["traces"]}
+
+
+async def test_new_and_edited_traces_merged(geovelo, coordinators):
+    geovelo.traces = [make_trace(2, 1), make_trace(1, 3)]
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+    revision = coordinator.data["revision"]
+
+    await coordinator.async_refresh()
+    assert coordinator.data["revision"] == revision
+
+    geovelo.traces = [make_trace(3, 0, distance=300), make_trace(2, 1, distance=2000)]
+    await coordinator.async_refresh()
+
+    assert coordinator.data["revision"] > revision
+    assert distances(coordinator) == {1: 1000, 2: 2000, 3: 300}
+    assert coordinator.query_stats()["distance"] == 3300
+    assert len(coordinator._edits) == 1
+
+
+async def test_hashes_stored_with_traces(hass_storage, geovelo, coordinators):
+    geovelo.traces = [make_trace(1, 1)]
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+    stored_hash = hass_storage[SYNC_KEY]["data"]["hashes"]["1"]
+
+    edited = make_trace(1, 1, distance=5000)
+    geovelo.traces = [edited]
+    with patch.object(
+        coordinator._custom_store, "async_save", AsyncMock(side_effect=OSError)
+    ):
+        await coordinator.async_refresh()
+
+    assert distances(coordinator) == {1: 5000}
+    assert hass_storage[SYNC_KEY]["data"]["hashes"]["1"] == stored_hash
+    assert hass_storage[TRACES_KEY]["data"][0]["distance"] == 1000
+
+    # write is retried on next refresh, even if nothing changed since
+    await coordinator.async_refresh()
+
+    assert hass_storage[TRACES_KEY]["data"][0]["distance"] == 5000
+    assert hass_storage[SYNC_KEY]["data"]["hashes"]["1"] == trace_hash(edited)
+
+
+async def test_analytics_backfilled_once(hass_storage, geovelo, coordinators):
+    stored = [make_trace(1, 1), make_trace(2, 3)]
+    for trace in stored:
+        for key in ("speeds", "elevations"):
+            trace.pop(key)
+    hass_storage[TRACES_KEY] = {
+        "version": 1,
+        "minor_version": 2,
+        "key": TRACES_KEY,
+        "data": stored,
+    }
+    # trace 2 has been deleted upstream
+    geovelo.traces = [make_trace(1, 1)]
+
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+
+    assert fetched_since(geovelo) > timedelta(days=365)
+    traces = {trace["id"]: trace for trace in coordinator.data["traces"]}
+    assert traces[1]["analytics"]["max_speed"] == 20
+    assert traces[2]["analytics"] == {}
+
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+
+    assert fetched_since(geovelo) < timedelta(days=60)
+
+
+async def test_traces_merged_when_zones_fail(geovelo, coordinators):
+    geovelo.traces = [make_trace(1, 1)]
+    geovelo.get_zones.return_value = [{"id": "zone"}]
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+
+    coordinator._zones_stale = True
+    geovelo.get_zones.side_effect = GeoveloApiError("zones unavailable")
+    geovelo.traces = [make_trace(2, 0), make_trace(1, 1)]
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert distances(coordinator) == {1: 1000, 2: 1000}
+    assert coordinator.data["zones"] == [{"id": "zone"}]
+    assert coordinator._zones_due(dt_util.now())
+
+
+async def test_zones_not_marked_fetched_when_traces_fail(geovelo, coordinators):
+    geovelo.traces = [make_trace(1, 1)]
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+    fetched_at = coordinator._zones_fetched_at
+
+    coordinator._zones_stale = True
+    geovelo.get_traces.side_effect = GeoveloApiError("traces unavailable")
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert coordinator._zones_stale
+    assert coordinator._zones_fetched_at == fetched_at
+
+
+async def test_traces_stored_when_first_zones_fail(
+    hass_storage, geovelo, coordinators
+):
+    geovelo.traces = [make_trace(1, 1)]
+    geovelo.get_zones.side_effect = GeoveloApiError("zones unavailable")
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert [trace["id"] for trace in hass_storage[TRACES_KEY]["data"]] == [1]
+
+    geovelo.get_zones.side_effect = None
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert distances(coordinator) == {1: 1000}
+    assert fetched_since(geovelo) < timedelta(days=60)
+
+
+def overlap_after_edits(coordinator, edits, now) -> timedelta:
+    """Overlap window at <now>, after edits given as (days before now, age in days of the trip)"""
+    coordinator._last_wide_sync = now
+    for days_ago, age in edits:
+        coordinator._record_edit(timedelta(days=age), now - timedelta(days=days_ago))
+    return coordinator._overlap_window(now)
+
+
+async def test_overlap_narrow_without_edits(coordinators):
+    coordinator = coordinators()
+
+    assert overlap_after_edits(coordinator, [], dt_util.now()) == (
+        GeoveloAPICoordinator.MIN_OVERLAP
+    )
+
+
+async def test_overlap_wide_until_wide_sync(coordinators):
+    coordinator = coordinators()
+    now = dt_util.now()
+    overlap_after_edits(coordinator, [], now)
+    coordinator._last_wide_sync = now - timedelta(days=2)
+
+    assert coordinator._overlap_window(now) == GeoveloAPICoordinator.MAX_OVERLAP
+
+
+async def test_overlap_after_single_old_edit_decays(coordinators):
+    coordinator = coordinators()
+    now = dt_util.now()
+
+    assert overlap_after_edits(coordinator, [(0, 25)], now) == timedelta(days=26)
+    later = now + timedelta(days=7)
+    coordinator._last_wide_sync = later
+    assert coordinator._overlap_window(later).total_seconds() == pytest.approx(
+        timedelta(days=13).total_seconds()
+    )
+    later = now + timedelta(days=40)
+    coordinator._last_wide_sync = later
+    assert coordinator._overlap_window(later) == GeoveloAPICoordinator.MIN_OVERLAP
+
+
+async def test_overlap_follows_frequent_edits(coordinators):
+    coordinator = coordinators()
+    now = dt_util.now()
+    # a 20 days old trip edited a month ago, then a trip edited 4 days after it every day
+    edits = [(30, 20)] + [(days_ago, 4) for days_ago in range(10, -1, -1)]
+
+    assert overlap_after_edits(coordinator, edits, now) == timedelta(days=5)
+    # the month old edit expired
+    assert [age for _, age in coordinator._edits] == [4] * len(coordinator._edits)
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from .common import TRACES_KEY, make_trace
+
+GEOMETRY = {"type": "LineString", "coordinates": [[2.35, 48.85], [2.36, 48.86]]}
+
+
+@pytest.fixture
+async def coordinator(geovelo, coordinators):
+    geovelo.traces = [make_trace(2, 1, geometry=GEOMETRY), make_trace(1, 2)]
+    await coordinators().async_refresh()
+    # routes must survive a restart
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+    return coordinator
+
+
+async def test_geometry_stored_compressed(hass_storage, coordinator):
+    stored = {trace["id"]: trace for trace in hass_storage[TRACES_KEY]["data"]}
+
+    assert isinstance(stored[2]["geometry"], str)
+    assert "geometry" not in stored[1]
+
+
+async def test_gpx_export(tmp_path, coordinator):
+    path = tmp_path / "traces.gpx"
+
+    assert await coordinator.async_export_traces(str(path), "gpx") == (1, 1)
+    content = path.read_text()
+    assert content.count("<trk>") == 1
+    assert '<trkpt lat="48.85" lon="2.35"/>' in content
+    assert content.endswith("</gpx>\n")
+
+
+async def test_jsonl_export(tmp_path, coordinator):
+    path = tmp_path / "traces.jsonl"
+
+    assert await coordinator.async_export_traces(str(path), "jsonl") == (2, 0)
+    traces = {
+        trace["id"]: trace for trace in map(json.loads, path.read_text().splitlines())
+    }
+    assert traces[2]["geometry"] == GEOMETRY
+    assert "geometry" not in traces[1]
+
+
+async def test_concurrent_exports(tmp_path, coordinator):
+    path = tmp_path / "traces.csv"
+
+    results = await asyncio.gather(
+        coordinator.async_export_traces(str(path), "csv"),
+        coordinator.async_export_traces(str(path), "csv"),
+    )
+
+    assert results == [(2, 0), (2, 0)]
+    assert len(path.read_text().splitlines()) == 3
+    assert [file.name for file in tmp_path.iterdir()] == ["traces.csv"]
+
+
+async def test_failed_export_cleaned_up(tmp_path, coordinator):
+    with (
+        patch("custom_components.geovelo.write_export_traces", side_effect=OSError),
+        pytest.raises(OSError),
+    ):
+        await coordinator.async_export_traces(str(tmp_path / "traces.csv"), "csv")
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.geovelo import GeoveloAPICoordinator
+from custom_components.geovelo.api import GeoveloApi
+
+CONFIG = {"username": "user", "password": "password", "user_id": 42}
+
+
+@pytest.fixture
+def authenticate():
+    with patch.object(
+        GeoveloApi,
+        "authenticate",
+        AsyncMock(side_effect=aiohttp.ClientError("connection reset")),
+    ) as authenticate:
+        yield authenticate
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant, authenticate):
+    coordinator = GeoveloAPICoordinator(hass, CONFIG)
+    # as if a full refresh already happened
+    coordinator.data = coordinator._build_data([], [])
+    yield coordinator
+    await coordinator.async_shutdown()
+
+
+async def test_failed_quick_refresh_is_not_raised(coordinator, authenticate):
+    await coordinator.async_request_quick_refresh()
+
+    assert authenticate.await_count == 1
+
+
+async def test_failed_quick_refresh_still_cools_down(
+    hass: HomeAssistant, coordinator, authenticate
+):
+    await coordinator.async_request_quick_refresh()
+    await coordinator.async_request_quick_refresh()
+    await coordinator.async_request_quick_refresh()
+
+    # calls during the cooldown are coalesced into a single one, at its end
+    assert authenticate.await_count == 1
+    async_fire_time_changed(
+        hass,
+        dt_util.utcnow()
+        + coordinator.QUICK_REFRESH_COOLDOWN
+        + timedelta(seconds=1),
+    )
+    await hass.async_block_till_done()
+    assert authenticate.await_count == 2
+
+
+async def test_failed_quick_refresh_raised_when_asked(coordinator):
+    with pytest.raises(HomeAssistantError):
+        await coordinator.async_request_quick_refresh(raise_on_failure=True)
+
+
+async def test_earlier_failure_not_raised_during_cooldown(coordinator, authenticate):
+    await coordinator.async_request_quick_refresh()
+
+    # this call only schedules a fetch at the end of the cooldown
+    await coordinator.async_request_quick_refresh(raise_on_failure=True)
+    assert authenticate.await_count == 1
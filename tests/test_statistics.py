@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.geovelo.statistics import HAS_MEAN_TYPE, HAS_UNIT_CLASS
+
+from .common import make_trace
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+@pytest.fixture
+async def imported(hass: HomeAssistant):
+    """Statistics rows sent to the recorder, per metric"""
+    await hass.config.async_set_time_zone("Europe/Paris")
+    hass.config.components.add("recorder")
+    calls = []
+    with patch(
+        "custom_components.geovelo.statistics.async_add_external_statistics",
+        side_effect=lambda hass, metadata, rows: calls.append((metadata, rows)),
+    ):
+        yield calls
+
+
+def rows(imported, metric) -> dict:
+    """(day, state, sum) of imported rows for <metric>, from the last import"""
+    found = {}
+    for metadata, metric_rows in imported:
+        if metadata["statistic_id"] != f"geovelo:{metric}_42":
+            continue
+        for row in metric_rows:
+            found[row["start"]] = (row["state"], row["sum"])
+    return found
+
+
+def midnight(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), tzinfo=PARIS)
+
+
+async def test_metadata(imported, geovelo, coordinators):
+    geovelo.traces = [make_trace(1, 1)]
+    await coordinators().async_refresh()
+
+    metadata = {metadata["statistic_id"]: metadata for metadata, _ in imported}
+    distance = metadata["geovelo:distance_42"]
+    assert distance["has_sum"] and distance["unit_of_measurement"] == "m"
+    if HAS_MEAN_TYPE:
+        assert distance["mean_type"] == 0
+    if HAS_UNIT_CLASS:
+        assert distance["unit_class"] == "distance"
+        assert metadata["geovelo:trips_42"]["unit_class"] is None
+
+
+async def test_days_in_home_assistant_time_zone(imported, geovelo, coordinators):
+    # 23:30 UTC is already the next day in Paris
+    geovelo.traces = [make_trace(1, 0, start_datetime="2026-10-01T23:30:00.000+0000")]
+    await coordinators().async_refresh()
+
+    assert rows(imported, "trips") == {midnight(date(2026, 10, 2)): (1, 1)}
+
+
+async def test_watermark_and_moved_day(imported, geovelo, coordinators):
+    geovelo.traces = [
+        make_trace(2, 0, start_datetime="2026-10-05T08:00:00.000+0200"),
+        make_trace(1, 0, start_datetime="2026-10-01T08:00:00.000+0200"),
+    ]
+    coordinator = coordinators()
+    await coordinator.async_refresh()
+    assert rows(imported, "distance") == {
+        midnight(date(2026, 10, 1)): (1000, 1000),
+        midnight(date(2026, 10, 5)): (1000, 2000),
+    }
+
+    # only days since the last imported one are sent, on top of the sums before it
+    imported.clear()
+    geovelo.traces.insert(
+        0, make_trace(3, 0, start_datetime="2026-10-07T08:00:00.000+0200")
+    )
+    await coordinator.async_refresh()
+    assert rows(imported, "distance") == {
+        midnight(date(2026, 10, 5)): (1000, 2000),
+        midnight(date(2026, 10, 7)): (1000, 3000),
+    }
+
+    # a trip moved to another day empties the day it was on
+    imported.clear()
+    geovelo.traces[1] = make_trace(
+        2, 0, start_datetime="2026-10-06T08:00:00.000+0200"
+    )
+    await coordinator.async_refresh()
+    assert rows(imported, "distance") == {
+        midnight(date(2026, 10, 5)): (0, 1000),
+        midnight(date(2026, 10, 6)): (1000, 2000),
+        midnight(date(2026, 10, 7)): (1000, 3000),
+    }